@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# app reads its config at import, so point it at a scratch data dir first
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="estate-deli-test-")
+os.environ["OWNER_NUMBER"] = "whatsapp:+10000000000"
+os.environ.pop("OPENAI_API_KEY", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as bot  # noqa: E402
+
+OWNER = "+10000000000"
+CUSTOMER = "+19999999999"
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    # replies and owner alerts are captured synchronously instead of going to Twilio
+    out = {"replies": [], "owner": []}
+    monkeypatch.setattr(bot, "send_async", lambda to, msg: out["replies"].append((to, msg)))
+    monkeypatch.setattr(bot, "notify_owner", out["owner"].append)
+    bot.user_state.clear()
+    for store in bot.STORES.values():
+        store.clear()
+    for counts in bot.DAILY_COUNTS.values():
+        counts.clear()
+    bot.SEATS_BOOKED.clear()
+    return out
+
+
+@pytest.fixture
+def say(sent):
+    client = bot.app.test_client()
+
+    def say(text, sender=CUSTOMER):
+        before = len(sent["replies"])
+        resp = client.post("/webhook", data={"From": f"whatsapp:{sender}", "Body": text})
+        assert resp.status_code == 200
+        replies = [msg for _, msg in sent["replies"][before:]]
+        return replies[-1] if replies else None
+
+    return say
@@ -0,0 +1,27 @@
+import time
+
+from conftest import CUSTOMER, bot
+
+
+def test_join_burst_keeps_newest_fragments_within_limit():
+    texts = ["a" * 200, "b" * 90, "c" * 100]
+    joined = bot.join_burst(texts)
+    assert joined == "b" * 90 + " " + "c" * 100
+    assert len(bot.join_burst(["x" * 150] * 5)) <= bot.AI_MAX_INPUT
+
+
+def test_debounced_burst_is_answered_once_and_logged(monkeypatch):
+    seen, sent, logged = [], [], []
+    monkeypatch.setattr(bot, "AI_DEBOUNCE", 0.05)
+    monkeypatch.setattr(bot, "get_ai_response", lambda m: seen.append(m) or "answer")
+    monkeypatch.setattr(bot, "send_twilio_message", lambda to, msg: sent.append((to, msg)))
+    monkeypatch.setattr(bot, "log_interaction", lambda *a: logged.append(a))
+
+    fragments = ["do you", "have vegan " + "x" * 150, "options " + "y" * 150]
+    for text in fragments:
+        bot.queue_ai_reply(CUSTOMER, text)
+    time.sleep(0.3)
+
+    assert len(seen) == 1 and len(seen[0]) <= bot.AI_MAX_INPUT
+    assert sent == [(CUSTOMER, "answer")]
+    assert logged == [(CUSTOMER, " ".join(fragments), "answer")]
@@ -0,0 +1,111 @@
+from datetime import date, timedelta
+
+import pytest
+
+from conftest import CUSTOMER, bot
+
+TODAY = date(2026, 10, 16)  # a Friday
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("25 Dec", date(2026, 12, 25)),
+    ("25th december", date(2026, 12, 25)),
+    ("Dec 25", date(2026, 12, 25)),
+    ("25/12", date(2026, 12, 25)),
+    ("25-12-2026", date(2026, 12, 25)),
+    ("2026-12-25", date(2026, 12, 25)),
+    ("4 people on 25 dec", date(2026, 12, 25)),
+    ("1 Oct", date(2027, 10, 1)),
+    ("today", TODAY),
+    ("Tomorrow!", TODAY + timedelta(days=1)),
+    ("day after tomorrow", TODAY + timedelta(days=2)),
+    ("sunday", date(2026, 10, 18)),
+    ("friday", TODAY),
+    ("next friday", TODAY + timedelta(days=7)),
+    ("next sunday", date(2026, 10, 25)),
+    ("31 feb", None),
+    ("soon", None),
+])
+def test_parse_booking_date(text, expected):
+    assert bot.parse_booking_date(text, TODAY) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("7 pm", "19:00"), ("7pm", "19:00"), ("7 PM", "19:00"), ("7:30 pm", "19:30"),
+    ("7.30 p.m.", "19:30"), ("12 am", "00:00"), ("noon", "12:00"), ("19:30", "19:30"),
+    ("7", None), ("13 pm", None), ("25:00", None), ("later", None),
+])
+def test_parse_booking_time(text, expected):
+    assert bot.parse_booking_time(text) == expected
+
+
+def test_time_spellings_share_one_slot():
+    assert bot.slot_key("25 Dec", "7 pm", TODAY) == bot.slot_key("2026-12-25", "7pm") == ("2026-12-25", "19:00")
+
+
+def test_relative_dates_resolve_against_the_day_they_are_said():
+    assert bot.slot_key("tomorrow", "7 pm", TODAY) != bot.slot_key("tomorrow", "7 pm", TODAY + timedelta(days=1))
+
+
+def test_legacy_free_text_booking_resolves_against_its_timestamp():
+    legacy = {"date": "tomorrow", "time": "7 pm", "people": 2, "timestamp": "2026-10-16T10:00:00"}
+    assert bot.booking_slot(legacy) == ("2026-10-17", "19:00")
+
+
+def test_capacity_is_keyed_on_the_canonical_slot(sent):
+    for _ in range(bot.TABLES):
+        bot.add_record(bot.BOOKINGS_FILE, {"date": "2099-12-25", "time": "19:00", "people": bot.SEATS_PER_TABLE})
+    assert bot.check_table_availability("2099-12-25", "19:00", 2) == (False, 0)
+    assert bot.check_table_availability("2099-12-25", "19:30", 2) == (True, bot.TOTAL_SEATS)
+    assert bot.check_table_availability("2099-12-26", "19:00", 2)[0]
+
+
+def test_canonical_records_keep_their_slot_at_startup():
+    assert bot.booking_slot({"date": "2099-12-25", "time": "19:00"}) == ("2099-12-25", "19:00")
+
+
+def test_booking_flow_stores_canonical_slot(say, sent):
+    say("book table")
+    say("4")
+    assert say("someday") == bot.BOOKING_DATE_RETRY
+    assert say("25 Dec 2099") == bot.BOOKING_TIME_PROMPT
+    assert say("around seven") == bot.BOOKING_TIME_RETRY
+    reply = say("7:30pm")
+    assert reply == bot.BOOKING_CONFIRM_TEMPLATE.format(4, "Fri 25 Dec", "7:30 PM")
+    assert bot.BOOKINGS[-1]["date"] == "2099-12-25" and bot.BOOKINGS[-1]["time"] == "19:30"
+    assert bot.SEATS_BOOKED[("2099-12-25", "19:30")] == 4
+    assert CUSTOMER not in bot.user_state
+
+
+def test_past_dates_are_rejected(say):
+    say("book")
+    say("2")
+    assert say("25 Dec 2020") == bot.BOOKING_DATE_RETRY
+
+
+def test_full_slot_keeps_the_flow_open(say):
+    for _ in range(bot.TABLES):
+        bot.add_record(bot.BOOKINGS_FILE, {"date": "2099-12-25", "time": "19:00", "people": bot.SEATS_PER_TABLE})
+    say("book")
+    say("2")
+    say("25 dec 2099")
+    assert say("7 pm") == bot.BOOKING_FULL_TEMPLATE.format(0)
+    assert bot.user_state[CUSTOMER]["step"] == "time"
+    assert say("8 pm").startswith("✅")
+
+
+def test_earlier_time_today_is_rejected(say):
+    say("book")
+    say("2")
+    say("today")
+    assert say("12:00 am") == bot.BOOKING_TIME_PASSED
+
+
+def test_bare_numbers_stay_in_the_booking_flow(say):
+    say("book")
+    say("4")
+    assert say("3") == bot.BOOKING_DATE_RETRY
+    say("tomorrow")
+    assert say("2") == bot.BOOKING_TIME_RETRY
+    assert bot.user_state[CUSTOMER] == {"flow": "booking", "step": "time", "people": 4,
+                                        "date": (date.today() + timedelta(days=1)).isoformat()}
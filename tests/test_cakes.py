@@ -0,0 +1,61 @@
+from conftest import CUSTOMER, bot
+
+
+def test_flavour_windows_cycle_through_every_flavour():
+    shown = set()
+    for _ in range(len(bot.CAKE_FLAVOURS)):
+        lines = bot.next_flavour_lines(6)
+        assert len(lines) == 6 and all(line.startswith("• ") for line in lines)
+        shown.update(lines)
+    assert shown == {f"• {f}" for f in bot.CAKE_FLAVOURS}
+
+
+def test_known_flavour_is_ordered(say, sent):
+    say("order cake")
+    assert say("Red velvet please!") == bot.CAKE_CONFIRM_TEMPLATE.format("Red Velvet")
+    assert [c["flavour"] for c in bot.CAKES] == ["Red Velvet"]
+    assert sent["owner"] == [f"🎂 New cake order from {CUSTOMER}: Red Velvet"]
+    assert CUSTOMER not in bot.user_state
+
+
+def test_flavour_beats_menu_category_inside_the_cake_flow(say):
+    say("cake")
+    assert say("coffee") == bot.CAKE_CONFIRM_TEMPLATE.format("Coffee")
+    assert say("coffee") == bot.MENU_REPLIES["coffee"]
+
+
+def test_unknown_flavour_is_reprompted_not_recorded(say, sent):
+    say("cake")
+    assert say("pistachio rose") == bot.CAKE_RETRY
+    assert say("lemonade") == bot.CAKE_RETRY
+    assert bot.CAKES == [] and sent["owner"] == []
+    assert bot.user_state[CUSTOMER]["flow"] == "cake"
+
+
+def test_cancel_leaves_the_cake_flow(say, sent):
+    say("cake")
+    assert say("Cancel") == bot.CANCEL_REPLY
+    assert CUSTOMER not in bot.user_state
+    assert say("chocolate") == bot.FALLBACK_REPLY
+    assert bot.CAKES == []
+
+
+def test_review_after_leaving_the_cake_flow_is_not_an_order(say, sent):
+    say("cake")
+    say("6")
+    assert say("review: coffee was great") == bot.REVIEW_THANKS
+    assert bot.CAKES == []
+    assert len(sent["owner"]) == 1 and sent["owner"][0].startswith("⭐")
+
+
+def test_review_inside_the_cake_flow_is_saved_as_a_review(say):
+    say("cake")
+    assert say("review: the chocolate brownie was great") == bot.REVIEW_THANKS
+    assert bot.CAKES == []
+
+
+def test_cake_flow_only_takes_a_flavour_name(say):
+    say("cake")
+    assert say("coffee was great") == bot.CAKE_RETRY
+    assert say("I'd like a chocolate cake please") == bot.CAKE_CONFIRM_TEMPLATE.format("Chocolate")
+    assert [c["flavour"] for c in bot.CAKES] == ["Chocolate"]
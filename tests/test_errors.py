@@ -0,0 +1,31 @@
+import time
+
+from conftest import bot
+
+
+def raise_and_log(exc):
+    try:
+        raise exc
+    except Exception as e:
+        bot.log_webhook_error(e)
+
+
+def test_burst_is_collapsed_and_reported_when_window_closes(monkeypatch, caplog):
+    monkeypatch.setattr(bot, "EXC_LOG_WINDOW", 0.05)
+    bot._last_exc.clear()
+    for _ in range(4):
+        raise_and_log(ValueError("boom"))
+    tracebacks = [r for r in caplog.records if r.getMessage() == "webhook error: boom"]
+    assert len(tracebacks) == 1 and tracebacks[0].exc_info
+
+    time.sleep(0.2)
+    assert any("suppressed x3" in r.getMessage() and "ValueError:boom" in r.getMessage()
+               for r in caplog.records)
+
+
+def test_distinct_errors_each_get_a_traceback(monkeypatch, caplog):
+    monkeypatch.setattr(bot, "EXC_LOG_WINDOW", 60)
+    bot._last_exc.clear()
+    raise_and_log(ValueError("a"))
+    raise_and_log(KeyError("b"))
+    assert len([r for r in caplog.records if r.exc_info]) == 2
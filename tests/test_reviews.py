@@ -0,0 +1,50 @@
+import pytest
+
+from conftest import CUSTOMER, bot
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("review: great food rating: 5", ("great food", 5)),
+    ("review:great food rating:5", ("great food", 5)),
+    ("Review:Great coffee", ("Great coffee", None)),
+    ("REVIEW: lovely rating 4", ("lovely", 4)),
+    ("review: lovely rating: 4/5", ("lovely", 4)),
+    ("review: lovely rating: 3 stars!", ("lovely", 3)),
+    ("reviews: nice staff", ("nice staff", None)),
+    ("review: the rating system is odd", ("the rating system is odd", None)),
+    ("review: multi\nline rating: 2", ("multi\nline", 2)),
+    ("review: rating: 5", ("", 5)),
+    ("review:", ("", None)),
+    ("review: meh rating: 7", ("meh", 7)),
+    ("I'd like to leave a review", None),
+    ("great coffee, 5 stars", None),
+])
+def test_parse_review(text, expected):
+    assert bot.parse_review(text) == expected
+
+
+def test_long_review_is_truncated():
+    text, _ = bot.parse_review("review: " + "a" * 5000)
+    assert len(text) == bot.REVIEW_MAX_CHARS
+
+
+def test_review_is_saved_and_owner_notified(say, sent):
+    assert say("review: lovely coffee rating: 5") == bot.REVIEW_THANKS
+    assert bot.REVIEWS[-1]["sender"] == CUSTOMER
+    assert (bot.REVIEWS[-1]["review"], bot.REVIEWS[-1]["rating"]) == ("lovely coffee", 5)
+    assert sent["owner"] == [f"⭐ New review from {CUSTOMER} (5/5):\nlovely coffee"]
+
+
+def test_out_of_range_rating_is_not_saved(say, sent):
+    assert say("review: meh rating: 7") == bot.REVIEW_RATING_RETRY
+    assert bot.REVIEWS == [] and sent["owner"] == []
+
+
+def test_empty_review_gets_the_prompt(say):
+    assert say("review:") == bot.REVIEW_PROMPT
+    assert bot.REVIEWS == []
+
+
+def test_rating_only_review_is_saved(say):
+    assert say("review: rating: 4") == bot.REVIEW_THANKS
+    assert bot.REVIEWS[-1]["review"] == "No comment"
@@ -0,0 +1,17 @@
+import json
+import os
+
+from conftest import bot
+
+
+def test_legacy_json_store_is_migrated_once(tmp_path):
+    old, new = tmp_path / "reviews.json", tmp_path / "reviews.jsonl"
+    records = [{"sender": "a", "review": "x"}, {"sender": "b", "review": "y"}]
+    old.write_text(json.dumps(records), encoding="utf-8")
+    bot.migrate_json_to_jsonl(str(old), str(new))
+    assert not old.exists() and not os.path.exists(str(new) + ".tmp")
+    assert list(bot.iter_jsonl(str(new))) == records
+
+    old.write_text("[]", encoding="utf-8")
+    bot.migrate_json_to_jsonl(str(old), str(new))
+    assert old.exists() and list(bot.iter_jsonl(str(new))) == records
@@ -0,0 +1,23 @@
+from urllib.parse import parse_qs
+
+from conftest import bot
+
+
+def test_from_prefix():
+    assert bot.from_prefix("whatsapp:+14155238886") == "From=whatsapp%3A%2B14155238886&"
+    assert bot.from_prefix(None) == ""
+    assert bot.from_prefix("") == ""
+
+
+def test_form_body_round_trips(monkeypatch):
+    calls = []
+
+    class Resp:
+        status_code = 201
+        text = "ok"
+
+    monkeypatch.setattr(bot.TWILIO_SESSION, "post", lambda url, data, **kw: calls.append(data) or Resp())
+    monkeypatch.setattr(bot, "FROM_PREFIX", bot.from_prefix("whatsapp:+14155238886"))
+    assert bot.send_twilio_message("+1555", bot.MAIN_MENU)
+    form = parse_qs(calls[0].decode("ascii"))
+    assert form == {"From": ["whatsapp:+14155238886"], "To": ["whatsapp:+1555"], "Body": [bot.MAIN_MENU]}
@@ -0,0 +1,129 @@
+from conftest import CUSTOMER, OWNER, bot
+
+
+def test_normalize_text_keeps_punctuated_words_apart():
+    assert bot.normalize_text("Hi!") == "hi"
+    assert bot.normalize_text("View   Menu.") == "view menu"
+    assert bot.normalize_text("coffee,matcha") == "coffee matcha"
+    assert bot.normalize_text("review:great food rating:5") == "review great food rating 5"
+
+
+def test_punctuated_commands_match(say):
+    assert say("Hi!") == bot.MAIN_MENU
+    assert say("1.") == bot.MENU_CATEGORIES_REPLY
+    assert say("View  Menu.") == bot.MENU_CATEGORIES_REPLY
+
+
+def test_review_without_space_after_colon_is_saved(say, sent):
+    assert say("review:great food rating:5").startswith("🙏")
+    assert bot.REVIEWS[-1]["review"] == "great food"
+    assert bot.REVIEWS[-1]["rating"] == 5
+
+
+def test_review_naming_a_category_is_saved_not_routed(say):
+    assert say("Review:Great coffee").startswith("🙏")
+    assert bot.REVIEWS[-1]["review"] == "Great coffee"
+
+
+def test_free_text_routes_on_specific_keywords_only(say):
+    assert say("what's the rate for a cake") == bot.FALLBACK_REPLY
+    assert say("is the food good") == bot.FALLBACK_REPLY
+    assert say("can I leave some feedback?") == bot.REVIEW_PROMPT
+    assert say("what are your prices") == bot.MENU_CATEGORIES_REPLY
+
+
+def test_owner_commands_match_by_prefix(say):
+    assert say("reports", sender=OWNER).startswith("📊 Daily Report")
+    assert say("Report today", sender=OWNER).startswith("📊 Daily Report")
+    assert say("reviews?", sender=OWNER) == "📢 Total Reviews: 0"
+    assert say("report") == bot.FALLBACK_REPLY
+
+
+def test_ai_fallback_is_off_by_default(say, monkeypatch):
+    assert not bot.AI_FALLBACK_ENABLED and bot.client is None
+    queued = []
+    monkeypatch.setattr(bot, "queue_ai_reply", lambda *a: queued.append(a))
+    assert say("do you have gluten free options") == bot.FALLBACK_REPLY
+    assert not queued
+
+
+def test_commands_win_inside_the_cake_flow(say, sent):
+    say("2")
+    assert say("3") == bot.BOOKING_PROMPT
+    assert bot.user_state[CUSTOMER]["flow"] == "booking"
+    say("cake")
+    assert say("1") == bot.MENU_CATEGORIES_REPLY
+    assert say("book table") == bot.BOOKING_PROMPT
+    assert bot.CAKES == [] and sent["owner"] == []
+
+
+def test_booking_party_size_claims_bare_numbers(say):
+    say("book")
+    assert say("2") == bot.BOOKING_DATE_PROMPT
+    assert bot.user_state[CUSTOMER]["people"] == 2
+
+
+def test_greeting_resets_an_open_flow(say):
+    say("book")
+    assert say("hi") == bot.MAIN_MENU
+    assert CUSTOMER not in bot.user_state
+
+
+def test_owner_commands_come_before_customer_routing(say):
+    assert say("report", sender=OWNER).startswith("📊 Daily Report")
+    assert say("hi", sender=OWNER) == bot.MAIN_MENU
+
+
+def test_open_flow_answers_before_intents(say):
+    say("book")
+    say("2")
+    assert say("coffee prices please") == bot.BOOKING_DATE_RETRY
+    assert bot.user_state[CUSTOMER]["step"] == "date"
+
+
+def test_review_submission_is_not_swallowed_by_an_open_flow(say):
+    say("book")
+    say("2")
+    assert say("review: lovely coffee") == bot.REVIEW_THANKS
+    assert bot.user_state[CUSTOMER]["step"] == "date"
+
+
+def test_other_commands_close_the_open_flow(say):
+    say("cake")
+    assert say("1") == bot.MENU_CATEGORIES_REPLY
+    assert CUSTOMER not in bot.user_state
+
+
+def test_review_submission_beats_intent_routing(say):
+    assert say("review: the coffee menu is great") == bot.REVIEW_THANKS
+
+
+def test_intent_priority_is_category_then_review_then_menu(say):
+    assert say("coffee prices please") == bot.MENU_REPLIES["coffee"]
+    assert say("feedback about the menu") == bot.REVIEW_PROMPT
+    assert say("show me the drinks") == bot.MENU_CATEGORIES_REPLY
+
+
+def test_unique_category_prefix_before_fallback(say):
+    assert say("cof") == bot.MENU_REPLIES["coffee"]
+    assert say("desser") == bot.MENU_REPLIES["desserts"]
+    assert say("sig") == bot.FALLBACK_REPLY
+
+
+def test_empty_or_senderless_payloads_are_acknowledged(sent):
+    client = bot.app.test_client()
+    assert client.post("/webhook", data={"From": "whatsapp:+1", "Body": ""}).get_json() == {"status": "ok"}
+    assert client.post("/webhook", json={"text": "hi"}).get_json() == {"status": "ok"}
+    assert client.post("/webhook", json={"from": CUSTOMER, "text": "hi"}).get_json() == {"status": "success"}
+    assert sent["replies"] == [(CUSTOMER, bot.MAIN_MENU)]
+
+
+def test_review_gate_follows_the_intent_scan():
+    assert bot.classify_intent("review great food rating 5")[1]
+    assert bot.classify_intent("reviews nice staff")[1]
+    assert not bot.classify_intent("great coffee 5 stars")[1]
+    assert bot.classify_intent("feedback about the menu") == ((bot.cmd_review_prompt, "feedback"), False)
+
+
+def test_reviews_plural_marker_is_saved(say):
+    assert say("Reviews: nice staff") == bot.REVIEW_THANKS